@@ -1,28 +1,198 @@
 import asyncio
 import base64
+import contextlib
 
 import streamlit as st
 
 from utils.ai import (
+    LLM_MODEL,
     ai_finder,
-    ai_stream_response,
+    ai_finder_incremental,
+    ai_main,
+    embeddings,
     extract_search_keywords,
     evaluate_sufficiency,
+    folder_signature,
+    format_sources,
+    preview_context,
+    prompt_cache,
 )
+from utils.cache import get_response, prompt_key, put_response
 from utils.scraper import use_scraper, use_search, search_pdfs
 
 
-def get_base64(file_path):
+@st.cache_data(show_spinner=False)
+def get_base64(file_path: str) -> str:
     with open(file_path, "rb") as f:
         return base64.b64encode(f.read()).decode()
 
 
-img_b64 = get_base64("public/tech.png")
+@st.cache_data(show_spinner=False)
+def header_html(logo_path: str) -> str:
+    img_b64 = get_base64(logo_path)
+    return f'<span style="font-size:2em; font-weight:bold;">Scoutly Research Assistant & RAG</span> <img src="data:image/png;base64,{img_b64}" width="100" style="vertical-align:middle; margin-right:20px;"> '
 
-st.markdown(
-    f'<span style="font-size:2em; font-weight:bold;">Scoutly Research Assistant & RAG</span> <img src="data:image/png;base64,{img_b64}" width="100" style="vertical-align:middle; margin-right:20px;"> ',
-    unsafe_allow_html=True,
-)
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Return this session's event loop, reused across Streamlit reruns.
+
+    The loop is a uvloop loop where uvloop is installed.
+    """
+    if "_loop" not in st.session_state:
+        try:
+            import uvloop
+
+            st.session_state._loop = uvloop.new_event_loop()
+        except ImportError:
+            # uvloop is unavailable on Windows; fall back to the default loop
+            st.session_state._loop = asyncio.new_event_loop()
+    return st.session_state._loop
+
+
+async def build_vectorstore(folder_name: str, topic: str):
+    """Build the folder's vector store, reusing it while the folder is unchanged.
+
+    Files added since the last build are embedded and appended incrementally
+    instead of re-embedding the whole folder. Only the latest folder's store
+    is kept, since every question scrapes into a new folder.
+    """
+    signature = folder_signature(folder_name)
+    cached = st.session_state.get("_vectorstore")
+    if cached and cached[0] != folder_name:
+        cached = None
+    if cached and cached[1] == signature:
+        return cached[2]
+
+    if cached:
+        new_files = [entry[0] for entry in set(signature) - set(cached[1])]
+        vectorstore = await ai_finder_incremental(cached[2], folder_name, new_files)
+    else:
+        vectorstore = await ai_finder(folder_name, topic)
+    st.session_state._vectorstore = (folder_name, signature, vectorstore)
+    return vectorstore
+
+
+async def run_pipeline(prompt: str, prompt_vector: list[float]):
+    """Research the question.
+
+    `prompt_vector` is the question's embedding, reused for every retrieval
+    in the adaptive loop instead of re-embedding the same text.
+
+    Returns:
+        Tuple of (vector store to answer from, search keywords)
+    """
+    # Extract keywords with AI strategy
+    with st.spinner("🧠 Analyzing question and planning research..."):
+        search_strategy = await extract_search_keywords(prompt)
+        keywords = search_strategy["keywords"]
+        max_pages = search_strategy.get("max_pages", 5)
+        retry_keywords = search_strategy.get("retry_keywords", [])
+        search_type = search_strategy.get("search_type", "general")
+
+    st.info(
+        f"📊 Research plan: {len(keywords)} search topics, will scrape up to {max_pages} pages"
+    )
+
+    # Initial search
+    with st.spinner("Searching for information..."):
+        search_results, search_time = await use_search(
+            keywords, search_type=search_type, max_results_per_query=8
+        )
+
+    # Initial scrape
+    with st.spinner("Scraping web pages..."):
+        folder_name, next_index = await use_scraper(search_results, search_time)
+    scraped_urls = {r["href"] for r in search_results}
+
+    # Build initial RAG
+    with st.spinner("Building knowledge base..."):
+        topic = " ".join(keywords)
+        vectorstore = await build_vectorstore(folder_name, topic)
+
+    # Retrieved context per folder signature: rounds that add nothing reuse it
+    contexts = {}
+
+    def retrieve_context() -> str:
+        version = folder_signature(folder_name)
+        if version not in contexts:
+            docs = vectorstore.similarity_search_by_vector(prompt_vector, k=5)
+            contexts[version] = preview_context(docs)
+        return contexts[version]
+
+    # Evaluate sufficiency
+    with st.spinner("Evaluating research depth..."):
+        evaluation = await evaluate_sufficiency(prompt, retrieve_context())
+
+    # Adaptive loop: get more info if needed
+    max_iterations = 3
+    iteration = 0
+
+    while not evaluation["sufficient"] and iteration < max_iterations:
+        iteration += 1
+        st.info(
+            f"🔄 Need more info ({iteration}/{max_iterations}): {evaluation['reason']}"
+        )
+
+        # Get additional keywords
+        additional_keywords = evaluation.get("retry_keywords", [])
+        if not additional_keywords and retry_keywords:
+            additional_keywords = retry_keywords
+
+        if not additional_keywords:
+            break
+
+        # Look for a relevant PDF in the background on the first round;
+        # it is independent of the text search and scrape
+        pdf_task = None
+        if iteration == 1:
+            pdf_task = asyncio.create_task(
+                search_pdfs(additional_keywords[:1], folder_name, max_pdfs=1)
+            )
+
+        # The session loop outlives this question, so a PDF task left running
+        # after a failed round would later write into this folder
+        try:
+            # Search more
+            with st.spinner(f"Searching for more information (round {iteration + 1})..."):
+                more_results, _ = await use_search(
+                    additional_keywords[:2], search_type=search_type, max_results_per_query=5
+                )
+
+            # Only scrape pages not fetched in an earlier round
+            more_results = [r for r in more_results if r["href"] not in scraped_urls]
+            scraped_urls.update(r["href"] for r in more_results)
+
+            # Scrape more while the PDF download finishes
+            with st.spinner(f"Scraping additional pages (round {iteration + 1})..."):
+                if more_results:
+                    folder_name, next_index = await use_scraper(
+                        more_results, 0, folder_name, next_index
+                    )
+                pdf_count = await pdf_task if pdf_task else 0
+                if pdf_count > 0:
+                    st.info(f"📄 Downloaded {pdf_count} relevant PDF")
+        finally:
+            if pdf_task and not pdf_task.done():
+                pdf_task.cancel()
+                # Wait for the cancellation so partial files are cleaned up
+                with contextlib.suppress(asyncio.CancelledError):
+                    await pdf_task
+
+        # Rebuild RAG with new content
+        with st.spinner("Updating knowledge base..."):
+            vectorstore = await build_vectorstore(folder_name, topic)
+
+        # Re-evaluate
+        with st.spinner("Re-evaluating..."):
+            evaluation = await evaluate_sufficiency(prompt, retrieve_context())
+
+    if not evaluation["sufficient"]:
+        st.warning("⚠️ Could not gather complete information, but here's what we found:")
+
+    return vectorstore, keywords
+
+
+st.markdown(header_html("public/tech.png"), unsafe_allow_html=True)
 
 # Initialize chat history
 if "messages" not in st.session_state:
@@ -33,125 +203,81 @@ for message in st.session_state.messages:
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
 
-# Accept user input
-if prompt := st.chat_input("Enter your research question"):
-    # Add user message to chat history
-    st.session_state.messages.append({"role": "user", "content": prompt})
-    # Display user message in chat message container
-    with st.chat_message("user"):
-        st.markdown(prompt)
-
-    # Display assistant response in chat message container
-    with st.chat_message("assistant"):
-        try:
-            # Extract keywords with AI strategy
-            with st.spinner("🧠 Analyzing question and planning research..."):
-                search_strategy = asyncio.run(extract_search_keywords(prompt))
-                keywords = search_strategy["keywords"]
-                max_pages = search_strategy.get("max_pages", 5)
-                retry_keywords = search_strategy.get("retry_keywords", [])
-                search_type = search_strategy.get("search_type", "general")
-
-            st.info(
-                f"📊 Research plan: {len(keywords)} search topics, will scrape up to {max_pages} pages"
-            )
 
-            # Initial search
-            with st.spinner("Searching for information..."):
-                search_results, search_time = asyncio.run(
-                    use_search(keywords, search_type=search_type, max_results_per_query=8)
-                )
+def mark_running() -> None:
+    st.session_state.running = True
 
-            # Initial scrape
-            with st.spinner("Scraping web pages..."):
-                folder_name, next_index = asyncio.run(
-                    use_scraper(search_results, search_time)
-                )
 
-            # Build initial RAG
-            with st.spinner("Building knowledge base..."):
-                topic = " ".join(keywords)
-                vectorstore = asyncio.run(ai_finder(folder_name, topic))
+# Accept user input; the box is disabled while a question is being answered
+# so it can't be submitted twice
+if prompt := st.chat_input(
+    "Enter your research question",
+    disabled=st.session_state.get("running", False),
+    on_submit=mark_running,
+):
+    try:
+        cache_key = prompt_key(prompt, LLM_MODEL)
 
-            # Evaluate sufficiency
-            with st.spinner("Evaluating research depth..."):
-                retriever = vectorstore.as_retriever(search_kwargs={"k": 5})
-                initial_docs = retriever.invoke(prompt)
-                context = "\n\n".join([doc.page_content for doc in initial_docs])
+        # Add user message to chat history
+        st.session_state.messages.append({"role": "user", "content": prompt})
+        # Display user message in chat message container
+        with st.chat_message("user"):
+            st.markdown(prompt)
 
-                evaluation = asyncio.run(evaluate_sufficiency(prompt, context))
+        # Display assistant response in chat message container
+        with st.chat_message("assistant"):
+            # Serve identical or paraphrased questions straight from the cache
+            cached = get_response(cache_key)
+            prompt_vector = None
+            if not cached:
+                # The similarity lookup is best-effort: if embedding fails here,
+                # the pipeline below retries it and reports the error
+                try:
+                    prompt_vector = embeddings.embed_query(prompt)
+                    similar_key = prompt_cache.lookup(prompt_vector)
+                    if similar_key:
+                        cached = get_response(similar_key)
+                except Exception:
+                    prompt_vector = None
 
-            # Adaptive loop: get more info if needed
-            max_iterations = 3
-            iteration = 0
+            if cached:
+                response_text = cached["text"] + format_sources(cached["sources"])
+                st.markdown(response_text)
+            else:
+                try:
+                    if prompt_vector is None:
+                        prompt_vector = embeddings.embed_query(prompt)
+                    vectorstore, keywords = get_loop().run_until_complete(
+                        run_pipeline(prompt, prompt_vector)
+                    )
 
-            while not evaluation["sufficient"] and iteration < max_iterations:
-                iteration += 1
-                st.info(
-                    f"🔄 Need more info ({iteration}/{max_iterations}): {evaluation['reason']}"
-                )
+                    # Generate response, showing tokens as they arrive
+                    placeholder = st.empty()
+                    parts = []
 
-                # Get additional keywords
-                additional_keywords = evaluation.get("retry_keywords", [])
-                if not additional_keywords and retry_keywords:
-                    additional_keywords = retry_keywords
-
-                if not additional_keywords:
-                    break
-
-                # Search more
-                with st.spinner(
-                    f"Searching for more information (round {iteration + 1})..."
-                ):
-                    more_results, _ = asyncio.run(use_search(additional_keywords[:2], search_type=search_type, max_results_per_query=5))
-
-                # Scrape more
-                with st.spinner(
-                    f"Scraping additional pages (round {iteration + 1})..."
-                ):
-                    folder_name, next_index = asyncio.run(
-                        use_scraper(more_results, 0, folder_name, next_index)
-                    )
+                    def show_token(token: str) -> None:
+                        parts.append(token)
+                        placeholder.markdown("".join(parts))
 
-                # Search and download PDF if needed
-                if iteration == 1:
-                    with st.spinner("Searching for relevant PDFs..."):
-                        pdf_count = asyncio.run(
-                            search_pdfs(
-                                additional_keywords[:1], folder_name, max_pdfs=1
-                            )
+                    with st.spinner("Generating response..."):
+                        answer, sources = get_loop().run_until_complete(
+                            ai_main(vectorstore, prompt, on_token=show_token, keywords=keywords)
                         )
-                        if pdf_count > 0:
-                            st.info(f"📄 Downloaded {pdf_count} relevant PDF")
-
-                # Rebuild RAG with new content
-                with st.spinner("Updating knowledge base..."):
-                    vectorstore = asyncio.run(ai_finder(folder_name, topic))
-
-                # Re-evaluate
-                with st.spinner("Re-evaluating..."):
-                    retriever = vectorstore.as_retriever(search_kwargs={"k": 5})
-                    initial_docs = retriever.invoke(prompt)
-                    context = "\n\n".join([doc.page_content for doc in initial_docs])
-                    evaluation = asyncio.run(evaluate_sufficiency(prompt, context))
-
-            if not evaluation["sufficient"]:
-                st.warning(
-                    "⚠️ Could not gather complete information, but here's what we found:"
-                )
-
-            # Generate response
-            response_text = ""
-            response_placeholder = st.empty()
+                    response_text = answer + format_sources(sources)
+                    placeholder.markdown(response_text)
 
-            with st.spinner("Generating response..."):
-                for chunk in ai_stream_response(vectorstore, prompt):
-                    response_text += chunk
-                    response_placeholder.write(response_text)
+                    # Cached as the bare answer plus its sources, like the CLI
+                    if answer != "RAG failed":
+                        put_response(cache_key, answer, sources)
+                        prompt_cache.add(prompt_vector, cache_key)
 
-        except Exception as e:
-            st.error(f"❌ Error: {str(e)}")
-            response_text = f"Error: {str(e)}"
+                except Exception as e:
+                    st.error(f"❌ Error: {str(e)}")
+                    response_text = f"Error: {str(e)}"
 
-    # Add assistant response to chat history
-    st.session_state.messages.append({"role": "assistant", "content": response_text})
+        # Add assistant response to chat history
+        st.session_state.messages.append({"role": "assistant", "content": response_text})
+    finally:
+        # Re-enable the input, also when the run is stopped part-way
+        st.session_state.running = False
+    st.rerun()
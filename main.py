@@ -1,7 +1,36 @@
 import asyncio
 import time
-from utils.scraper import use_scraper, use_search
-from utils.ai import extract_search_keywords, ai_finder, ai_main
+from utils.scraper import close_client, use_scraper, use_search
+from utils.ai import (
+    CHUNK_OVERLAP_TOKENS,
+    CHUNK_SIZE_TOKENS,
+    LLM_MODEL,
+    close_models,
+    extract_search_keywords,
+    ai_finder,
+    ai_main,
+)
+from utils.cache import get_response, prompt_key, put_response
+
+
+def print_response_header() -> None:
+    print("\n" + "=" * 60)
+    print("📄 RESPONSE")
+    print("=" * 60)
+
+
+def print_sources(sources: list[str]) -> None:
+    print("=" * 60)
+
+    print("\n🔗 SOURCE DOCUMENTS:")
+    for i, source in enumerate(sources, 1):
+        print(f"  {i}. {source}")
+
+
+def print_response(response: str, sources: list[str]) -> None:
+    print_response_header()
+    print(f"{response}")
+    print_sources(sources)
 
 
 async def main():
@@ -14,6 +43,14 @@ async def main():
 
     current_time = time.time()
 
+    cache_key = prompt_key(user_prompt, LLM_MODEL)
+    cached = get_response(cache_key)
+    if cached:
+        print("⚡ Answer served from cache")
+        print_response(cached["text"], cached["sources"])
+        print(f"\n⏱️  Total Completed in {time.time() - current_time:.2f} seconds.")
+        return
+
     # Print AI Configuration at startup
     print("\n" + "=" * 60)
     print("🤖 SCOUTLY RESEARCH AGENT - AI CONFIGURATION")
@@ -52,17 +89,19 @@ async def main():
     vectorstore = await ai_finder(folder_name, topic)
 
     print("🤖 Generating response...")
-    response, sources = await ai_main(vectorstore, user_prompt)
-
-    print("\n" + "=" * 60)
-    print("📄 RESPONSE")
-    print("=" * 60)
-    print(f"{response}")
-    print("=" * 60)
-
-    print("\n🔗 SOURCE DOCUMENTS:")
-    for i, source in enumerate(sources, 1):
-        print(f"  {i}. {source}")
+    print_response_header()
+    # Print the answer as it is generated
+    response, sources = await ai_main(
+        vectorstore,
+        user_prompt,
+        on_token=lambda t: print(t, end="", flush=True),
+        keywords=keywords,
+    )
+    print(response if response == "RAG failed" else "")
+    if response != "RAG failed":
+        put_response(cache_key, response, sources)
+
+    print_sources(sources)
 
     print("\n" + "=" * 60)
     print("🧠 AI METADATA USED")
@@ -70,14 +109,29 @@ async def main():
     print("📊 Configuration:")
     print("  • Embedding Model: embeddinggemma")
     print("  • LLM Model: minimax-m2.5:cloud")
-    print("  • Vector Store: FAISS")
-    print("  • Vector DB Path: Managed in memory")
-    print("  • Chunk Size: 1000 tokens")
-    print("  • Chunk Overlap: 200 tokens")
+    print("  • Vector Store: FAISS (in memory, rebuilt per question)")
+    print(f"  • Chunk Size: {CHUNK_SIZE_TOKENS} tokens")
+    print(f"  • Chunk Overlap: {CHUNK_OVERLAP_TOKENS} tokens")
     print("  • Retrieval K: 5 documents")
     print("=" * 60)
     print(f"\n⏱️  Total Completed in {time.time() - current_time:.2f} seconds.")
 
 
+async def run() -> None:
+    try:
+        await main()
+    finally:
+        await close_client()
+        await close_models()
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        import uvloop
+
+        uvloop.install()
+    except ImportError:
+        # uvloop is unavailable on Windows; fall back to the default loop
+        pass
+
+    asyncio.run(run())
@@ -1,18 +1,243 @@
+import asyncio
+import hashlib
+import math
 import os
-
+import re
+import uuid
+import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable
+
+import faiss
+import httpx
+import numpy as np
+import tiktoken
+import zstandard
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_ollama import OllamaEmbeddings, OllamaLLM
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from pypdf import PdfReader
+
+from utils.cache import SemanticCache
+from utils.embed_cache import cached_embed
+from utils.scraper import NEXT_INDEX_FILE, RES_SUFFIX, SOURCES_INDEX
+from utils.server_embeddings import ServerEmbeddings
 
 # Centralized model configuration
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "embeddinggemma")
 LLM_MODEL = os.getenv("LLM_MODEL", "minimax-m2.5:cloud")
+# Optional Infinity / text-embeddings-inference server serving EMBEDDING_MODEL;
+# Ollama embeds when unset
+EMBEDDING_SERVER_URL = os.getenv("EMBEDDING_SERVER_URL")
+# Texts per embedding request; OllamaEmbeddings posts each batch to /api/embed
+# as a single call. Larger batches (e.g. 128) suit GPU-backed servers.
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+# Batches in flight at once; match the server's OLLAMA_NUM_PARALLEL
+EMBED_CONCURRENCY = int(os.getenv("OLLAMA_NUM_PARALLEL", "4"))
+# Questions with at most this many meaningful words are searched as-is,
+# without asking the LLM for a search strategy
+SHORT_QUERY_WORDS = 4
+# Context shown to the sufficiency check, in tokens of the chunking encoder
+SUFFICIENCY_CONTEXT_TOKENS = 500
+
+# HNSW graph parameters: neighbours per node, build-time and query-time beam width
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = 32
+# Corpora this large switch to an IVFPQ index: 8-bit product-quantized codes
+# in inverted lists, searched over IVF_NPROBE of them
+IVFPQ_MIN_VECTORS = 10_000
+PQ_M = 32
+IVF_NPROBE = 16
+# k-means only needs a sample: this many training vectors per inverted list
+IVF_TRAIN_POINTS_PER_LIST = 256
+# "auto" picks HNSW or IVFPQ by corpus size; "sq8" keeps an exhaustive index
+# with 8-bit scalar-quantized vectors (a quarter of the float32 size) when
+# PQ recall is not good enough
+VECTOR_INDEX = os.getenv("VECTOR_INDEX", "auto")
+# Vectors are L2-normalized on the way in (documents and queries), so inner
+# product equals cosine similarity
+_STORE_OPTIONS = {
+    "distance_strategy": DistanceStrategy.MAX_INNER_PRODUCT,
+    "normalize_L2": True,
+}
+# LangChain's FAISS warns that normalize_L2 only suits Euclidean distance on
+# every build and load, yet still normalizes queries and added vectors, which
+# is what inner-product cosine search needs
+warnings.filterwarnings(
+    "ignore", message="Normalizing L2 is not applicable", category=UserWarning
+)
+
+# Chunk sizes are counted in tokens with tiktoken's C-backed encoder, so
+# chunks match the model's context budget rather than a character count.
+# Chunking parameters are fixed, so one splitter serves every build.
+CHUNK_SIZE_TOKENS = 512
+CHUNK_OVERLAP_TOKENS = 64
+_ENCODING_NAME = "cl100k_base"
+_ENCODING = tiktoken.get_encoding(_ENCODING_NAME)
+_SPLITTER = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+    encoding_name=_ENCODING_NAME,
+    chunk_size=CHUNK_SIZE_TOKENS,
+    chunk_overlap=CHUNK_OVERLAP_TOKENS,
+    # Scraped pages about LLMs often contain literal "<|endoftext|>"
+    disallowed_special=(),
+)
+
+# Chunks passed to the answer prompt, and the reciprocal rank fusion constant
+# used to merge per-query result lists
+RETRIEVAL_K = 5
+RRF_K = 60
+
+# Chunks whose SimHash signatures differ in at most this many bits are
+# treated as duplicates
+SIMHASH_MAX_DISTANCE = 3
+
+# Shared thread pool for reading and parsing scraped files
+_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 4)
+# PDF text extraction is CPU-bound pure Python, so it runs in processes
+_pdf_executor = ProcessPoolExecutor(max_workers=os.cpu_count() or 4)
 
 # Initialize embeddings and LLM
-embeddings = OllamaEmbeddings(model=EMBEDDING_MODEL)
-llm = OllamaLLM(model=LLM_MODEL)
+# Each Ollama wrapper keeps its own sync and async HTTP clients for its
+# lifetime; size their keep-alive pools for the concurrent embedding
+# batches and LLM calls so connections are reused instead of reopened
+_OLLAMA_CLIENT_KWARGS = {
+    "limits": httpx.Limits(max_connections=64, max_keepalive_connections=32)
+}
+
+
+def _make_embeddings() -> Embeddings:
+    if EMBEDDING_SERVER_URL:
+        return ServerEmbeddings(EMBEDDING_SERVER_URL, EMBEDDING_MODEL)
+    return OllamaEmbeddings(model=EMBEDDING_MODEL, client_kwargs=_OLLAMA_CLIENT_KWARGS)
+
+
+# Used for synchronous calls only (e.g. embed_query from the Streamlit script)
+embeddings = _make_embeddings()
+
+# The wrappers' async clients stay bound to the first event loop that uses
+# them, and every Streamlit session runs its own loop, so async calls go
+# through an (embeddings, llm) pair kept per loop
+_loop_models: dict[asyncio.AbstractEventLoop, tuple[Embeddings, OllamaLLM]] = {}
+
+
+def _models() -> tuple[Embeddings, OllamaLLM]:
+    """Return the (embeddings, llm) pair for the running event loop."""
+    loop = asyncio.get_running_loop()
+    # Drop pairs whose loops are gone
+    for stale in [lp for lp in list(_loop_models) if lp.is_closed()]:
+        _loop_models.pop(stale, None)
+
+    models = _loop_models.get(loop)
+    if models is None:
+        models = _loop_models[loop] = (
+            _make_embeddings(),
+            OllamaLLM(model=LLM_MODEL, client_kwargs=_OLLAMA_CLIENT_KWARGS),
+        )
+    return models
+
+
+async def close_models() -> None:
+    """Release the running loop's models, closing the embedding client."""
+    models = _loop_models.pop(asyncio.get_running_loop(), None)
+    if models and isinstance(models[0], ServerEmbeddings):
+        await models[0].aclose()
+
+
+def _loop_embeddings() -> Embeddings:
+    return _models()[0]
+
+
+def _loop_llm() -> OllamaLLM:
+    return _models()[1]
+
+
+# Parsed LLM answers for near-duplicate inputs. Sufficiency verdicts depend on
+# the retrieved context too, so they are keyed on question + context and need
+# a closer match. These caches persist across runs; the file names carry
+# the models so switching either one starts a fresh cache.
+_model_tag = hashlib.sha1(f"{EMBEDDING_MODEL}:{LLM_MODEL}".encode()).hexdigest()[:8]
+_keyword_cache = SemanticCache(f"keywords-{_model_tag}", max_entries=512)
+_sufficiency_cache = SemanticCache(
+    f"sufficiency-{_model_tag}", threshold=0.99, max_entries=512
+)
+# Prompt embedding -> response cache key, shared across sessions
+prompt_cache = SemanticCache(f"prompts-{_model_tag}", max_entries=2048)
+
+# "FIELD: value" lines in the structured LLM answers
+_STRATEGY_FIELD_RE = re.compile(
+    r"^\s*(KEYWORDS|MAX_PAGES|RETRY_KEYWORDS|SEARCH_TYPE|FOCUS_AREAS):(.*)$", re.M
+)
+_EVALUATION_FIELD_RE = re.compile(
+    r"^\s*(SUFFICIENT|REASON|RETRY_KEYWORDS|REFINED_QUERY):(.*)$", re.M
+)
+
+# Question-type triggers, matched against the prompt's words and word pairs
+_WORD_RE = re.compile(r"\w+")
+_COMPARISON_TERMS = frozenset({"vs", "versus", "compare", "difference", "better"})
+_HOWTO_TERMS = frozenset({"how to", "how do", "guide", "tutorial", "steps"})
+_EXPLANATION_TERMS = frozenset({"what is", "explain", "why does", "meaning"})
+_LIST_TERMS = frozenset({"list", "top", "best", "examples", "ways"})
+_ACADEMIC_TERMS = frozenset({"research", "study", "paper", "scientific", "evidence"})
+
+# Punctuation dropped from the prompt before taking fallback keywords
+_STRIP_PUNCT = str.maketrans("", "", "?.,!;:")
+
+# One SOURCES.md entry: its URL line and the File line that follows it
+_SOURCE_ENTRY_RE = re.compile(
+    r"^- URL: *(.+?)[ \t]*\n(?:(?!- (?:URL|File): ).*\n)*?- File: *(.+?)[ \t]*$",
+    re.M,
+)
+
+# Words dropped when falling back to keywords taken from the prompt itself
+_QUESTION_WORDS = frozenset(
+    {
+        "what",
+        "how",
+        "why",
+        "when",
+        "where",
+        "who",
+        "which",
+        "did",
+        "was",
+        "were",
+        "has",
+        "have",
+        "does",
+        "do",
+        "is",
+        "are",
+        "the",
+        "a",
+        "an",
+        "and",
+        "or",
+        "but",
+        "with",
+        "about",
+    }
+)
+
+
+def _split_list(value: str) -> list[str]:
+    """Split a comma-separated field into trimmed, non-empty items."""
+    return [k.strip() for k in value.split(",") if k.strip()]
+
+
+def _meaningful_words(user_prompt: str) -> list[str]:
+    """The prompt's words minus punctuation, question words and short words."""
+    words = user_prompt.lower().translate(_STRIP_PUNCT).split()
+    return [w for w in words if w not in _QUESTION_WORDS and len(w) > 2]
+
+
+def _fallback_keywords(user_prompt: str) -> list[str]:
+    """Build a single search phrase from the prompt's first meaningful words."""
+    filtered = _meaningful_words(user_prompt)
+    return [" ".join(filtered[:4])] if filtered else [user_prompt]
 
 
 async def extract_search_keywords(user_prompt: str) -> dict:
@@ -30,25 +255,29 @@ async def extract_search_keywords(user_prompt: str) -> dict:
     """
 
     # Detect question type for better keyword generation
-    question_lower = user_prompt.lower()
-    is_comparison = any(
-        word in question_lower
-        for word in ["vs", "versus", "compare", "difference", "better"]
-    )
-    is_howto = any(
-        word in question_lower
-        for word in ["how to", "how do", "guide", "tutorial", "steps"]
-    )
-    is_explanation = any(
-        word in question_lower for word in ["what is", "explain", "why does", "meaning"]
-    )
-    is_list = any(
-        word in question_lower for word in ["list", "top", "best", "examples", "ways"]
-    )
-    is_academic = any(
-        word in question_lower
-        for word in ["research", "study", "paper", "scientific", "evidence"]
-    )
+    tokens = _WORD_RE.findall(user_prompt.lower())
+    terms = set(tokens) | {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+    is_comparison = not terms.isdisjoint(_COMPARISON_TERMS)
+    is_howto = not terms.isdisjoint(_HOWTO_TERMS)
+    is_explanation = not terms.isdisjoint(_EXPLANATION_TERMS)
+    is_list = not terms.isdisjoint(_LIST_TERMS)
+    is_academic = not terms.isdisjoint(_ACADEMIC_TERMS)
+
+    # Short questions are already a good search phrase; skip the LLM
+    if len(_meaningful_words(user_prompt)) <= SHORT_QUERY_WORDS:
+        if is_comparison:
+            search_type = "comparison"
+        elif is_academic:
+            search_type = "academic"
+        else:
+            search_type = "general"
+        return {
+            "keywords": _fallback_keywords(user_prompt),
+            "max_pages": 5,
+            "retry_keywords": [],
+            "search_type": search_type,
+            "focus_areas": [],
+        }
 
     # Build context-aware prompt
     prompt = f"""You are a search strategy expert. Analyze this question and generate optimal search keywords.
@@ -79,116 +308,50 @@ Guidelines:
 - Prioritize exact phrases in quotes for specific terms"""
 
     try:
-        response = llm.invoke(prompt)
+        prompt_vector = await _loop_embeddings().aembed_query(user_prompt)
+        cached = _keyword_cache.lookup(prompt_vector)
+        if cached:
+            return cached
+
+        response = await _loop_llm().ainvoke(prompt)
         response_text = response.strip()
 
-        keywords = []
-        max_pages = 5
-        retry_keywords = []
-        search_type = "general"
-        focus_areas = []
-
-        for line in response_text.split("\n"):
-            line = line.strip()
-            if line.startswith("KEYWORDS:"):
-                keywords = [
-                    k.strip()
-                    for k in line.split("KEYWORDS:")[1].strip().split(",")
-                    if k.strip()
-                ]
-            elif line.startswith("MAX_PAGES:"):
-                try:
-                    max_pages = int(line.split("MAX_PAGES:")[1].strip())
-                except ValueError:
-                    max_pages = 5
-            elif line.startswith("RETRY_KEYWORDS:"):
-                retry_keywords = [
-                    k.strip()
-                    for k in line.split("RETRY_KEYWORDS:")[1].strip().split(",")
-                    if k.strip()
-                ]
-            elif line.startswith("SEARCH_TYPE:"):
-                search_type = line.split("SEARCH_TYPE:")[1].strip().lower()
-            elif line.startswith("FOCUS_AREAS:"):
-                focus_areas = [
-                    k.strip()
-                    for k in line.split("FOCUS_AREAS:")[1].strip().split(",")
-                    if k.strip()
-                ]
+        fields = {
+            m.group(1): m.group(2).strip()
+            for m in _STRATEGY_FIELD_RE.finditer(response_text)
+        }
+
+        keywords = _split_list(fields.get("KEYWORDS", ""))
+        try:
+            max_pages = int(fields.get("MAX_PAGES", 5))
+        except ValueError:
+            max_pages = 5
+        retry_keywords = _split_list(fields.get("RETRY_KEYWORDS", ""))
+        search_type = fields.get("SEARCH_TYPE", "general").lower()
+        focus_areas = _split_list(fields.get("FOCUS_AREAS", ""))
+
+        parsed = bool(keywords)
 
         # Fallback if parsing failed
         if not keywords:
-            words = user_prompt.lower().replace("?", "").split()
-            question_words = {
-                "what",
-                "how",
-                "why",
-                "when",
-                "where",
-                "who",
-                "which",
-                "did",
-                "was",
-                "were",
-                "has",
-                "have",
-                "does",
-                "do",
-                "is",
-                "are",
-                "the",
-                "a",
-                "an",
-                "and",
-                "or",
-                "but",
-                "with",
-                "about",
-            }
-            filtered = [w for w in words if w not in question_words and len(w) > 2]
-            keywords = [" ".join(filtered[:4])] if filtered else [user_prompt]
+            keywords = _fallback_keywords(user_prompt)
             max_pages = 5
 
-        return {
+        result = {
             "keywords": keywords[:5],
             "max_pages": max_pages,
             "retry_keywords": retry_keywords[:3],
             "search_type": search_type,
             "focus_areas": focus_areas,
         }
+        if parsed:
+            _keyword_cache.add(prompt_vector, result)
+        return result
 
     except Exception:
         # Simple fallback
-        words = user_prompt.lower().replace("?", "").split()
-        question_words = {
-            "what",
-            "how",
-            "why",
-            "when",
-            "where",
-            "who",
-            "which",
-            "did",
-            "was",
-            "were",
-            "has",
-            "have",
-            "does",
-            "do",
-            "is",
-            "are",
-            "the",
-            "a",
-            "an",
-            "and",
-            "or",
-            "but",
-            "with",
-            "about",
-        }
-        filtered = [w for w in words if w not in question_words and len(w) > 2]
         return {
-            "keywords": [" ".join(filtered[:4])] if filtered else [user_prompt],
+            "keywords": _fallback_keywords(user_prompt),
             "max_pages": 5,
             "retry_keywords": [],
             "search_type": "general",
@@ -196,9 +359,36 @@ Guidelines:
         }
 
 
+def preview_context(
+    docs: list[Document], limit: int = SUFFICIENCY_CONTEXT_TOKENS
+) -> str:
+    """Join document texts, cut to at most `limit` tokens.
+
+    Each document is encoded once; the cut is made on the tokens already
+    collected rather than by re-encoding the joined text.
+    """
+    separator = _ENCODING.encode("\n\n")
+    parts = []
+    tokens = []
+    for doc in docs:
+        if tokens:
+            tokens += separator
+        parts.append(doc.page_content)
+        tokens += _ENCODING.encode(doc.page_content, disallowed_special=())
+        if len(tokens) >= limit:
+            break
+    if len(tokens) <= limit:
+        return "\n\n".join(parts)
+    return _ENCODING.decode(tokens[:limit])
+
+
 async def evaluate_sufficiency(user_prompt: str, context: str) -> dict:
     """Evaluate if the scraped context is sufficient to answer the question.
 
+    Args:
+        user_prompt: The user's question
+        context: Retrieved text already bounded by preview_context
+
     Returns:
         dict with keys:
             - sufficient: bool
@@ -211,7 +401,7 @@ async def evaluate_sufficiency(user_prompt: str, context: str) -> dict:
 QUESTION: {user_prompt}
 
 CONTEXT AVAILABLE:
-{context[:2000]}
+{context}
 
 Evaluate if this context is sufficient to give a comprehensive answer. Consider:
 - Do you have enough details to explain the topic?
@@ -225,35 +415,33 @@ RETRY_KEYWORDS: if not sufficient, list 2-3 specific aspects that need more rese
 REFINED_QUERY: if not sufficient, a better search query to find missing information"""
 
     try:
-        response = llm.invoke(prompt)
+        input_vector = await _loop_embeddings().aembed_query(f"{user_prompt}\n\n{context}")
+        cached = _sufficiency_cache.lookup(input_vector)
+        if cached:
+            return cached
+
+        response = await _loop_llm().ainvoke(prompt)
         response_text = response.strip()
 
-        sufficient = False
-        reason = "Unable to evaluate"
-        retry_keywords = []
-        refined_query = ""
-
-        for line in response_text.split("\n"):
-            line = line.strip()
-            if line.startswith("SUFFICIENT:"):
-                sufficient = "yes" in line.lower().split("SUFFICIENT:")[1].strip()[:3]
-            elif line.startswith("REASON:"):
-                reason = line.split("REASON:")[1].strip()
-            elif line.startswith("RETRY_KEYWORDS:"):
-                retry_keywords = [
-                    k.strip()
-                    for k in line.split("RETRY_KEYWORDS:")[1].strip().split(",")
-                    if k.strip()
-                ]
-            elif line.startswith("REFINED_QUERY:"):
-                refined_query = line.split("REFINED_QUERY:")[1].strip()
+        fields = {
+            m.group(1): m.group(2).strip()
+            for m in _EVALUATION_FIELD_RE.finditer(response_text)
+        }
 
-        return {
+        sufficient = "yes" in fields.get("SUFFICIENT", "").lower()[:3]
+        reason = fields.get("REASON", "Unable to evaluate")
+        retry_keywords = _split_list(fields.get("RETRY_KEYWORDS", ""))
+        refined_query = fields.get("REFINED_QUERY", "")
+
+        result = {
             "sufficient": sufficient,
             "reason": reason,
             "retry_keywords": retry_keywords[:3],
             "refined_query": refined_query,
         }
+        if "SUFFICIENT" in fields:
+            _sufficiency_cache.add(input_vector, result)
+        return result
 
     except Exception:
         return {
@@ -264,168 +452,423 @@ REFINED_QUERY: if not sufficient, a better search query to find missing informat
         }
 
 
-async def ai_finder(folder_name: str, topic: str = "") -> FAISS:
-    """Process scraped text and PDFs, create embeddings, and build FAISS vector store."""
+def folder_signature(folder_name: str) -> tuple:
+    """Fingerprint a scrape folder by its content files' names, mtimes and sizes.
+
+    SOURCES.md, its index and the RES_ counter are left out since they
+    change after every scrape round.
+    """
+    with os.scandir(folder_name) as it:
+        return tuple(
+            sorted(
+                (entry.name, stat.st_mtime_ns, stat.st_size)
+                for entry in it
+                if entry.name not in ("SOURCES.md", SOURCES_INDEX, NEXT_INDEX_FILE)
+                for stat in (entry.stat(),)
+            )
+        )
+
+
+def _read_markdown(filepath: str) -> str:
+    """Read a scraped page, decompressing zstd-compressed ones."""
+    if filepath.endswith(".zst"):
+        with open(filepath, "rb") as f:
+            return zstandard.ZstdDecompressor().decompress(f.read()).decode("utf-8")
+    with open(filepath, "r", encoding="utf-8") as f:
+        return f.read()
+
 
-    all_documents = []
+def _parse_pdf(filepath: str) -> str:
+    """Extract the text of every page of a PDF (runs in a worker process)."""
+    # Imported lazily: most folders hold no PDFs
+    import pymupdf
+
+    with pymupdf.open(filepath) as doc:
+        return "\n".join(page.get_text("text") for page in doc)
+
+
+def _split_text(content: str, metadata: dict) -> list[Document]:
+    return [
+        Document(page_content=chunk, metadata=dict(metadata))
+        for chunk in _SPLITTER.split_text(content)
+    ]
+
+
+async def _load_one(filepath: str, filename: str, source_url: str) -> list[Document]:
+    """Read one scraped markdown file or PDF and split it into chunks.
+
+    Markdown is read on the thread pool, PDFs are parsed on the process pool.
+    Each file is split as soon as it is read, so the full text of the folder
+    is never held at once.
+    """
+    loop = asyncio.get_running_loop()
+
+    if filename.endswith((".md", RES_SUFFIX)) and filename != "SOURCES.md":
+        try:
+            content = await loop.run_in_executor(_executor, _read_markdown, filepath)
+        except Exception:
+            print(f" ! Error processing {filename}")
+            return []
+
+    elif filename.endswith(".pdf"):
+        try:
+            content = await loop.run_in_executor(_pdf_executor, _parse_pdf, filepath)
+        except Exception:
+            print(f" ! Error processing PDF {filename}")
+            return []
+
+    else:
+        return []
+
+    if not content.strip():
+        return []
+    metadata = {"source": source_url, "file": filename}
+    return await loop.run_in_executor(_executor, _split_text, content, metadata)
+
+
+async def load_chunks(
+    folder_name: str, filenames: list[str] | None = None
+) -> list[Document]:
+    """Load scraped markdown and PDFs from a folder as source-tagged chunks.
+
+    Markdown files are read concurrently on a thread pool and PDFs are
+    parsed in parallel on a process pool. Near-duplicate chunks (repeated
+    navigation, banners, mirrored pages) are dropped so each is embedded
+    and indexed once.
+
+    Args:
+        folder_name: Scrape folder containing RES_* pages, PDFs and SOURCES.md
+        filenames: Only load these files (defaults to everything in the folder)
+    """
 
     # Load source URL mapping from SOURCES.md
     source_map = {}
     sources_path = os.path.join(folder_name, "SOURCES.md")
     if os.path.exists(sources_path):
         with open(sources_path, "r", encoding="utf-8") as f:
-            current_file = None
-            current_url = None
-            for line in f:
-                line = line.strip()
-                if line.startswith("- URL: "):
-                    current_url = line.split("- URL: ")[1].strip()
-                elif line.startswith("- File: "):
-                    current_file = line.split("- File: ")[1].strip()
-                    # File always comes after URL, so save the pair
-                    if current_url:
-                        source_map[current_file] = current_url
-                    current_file = None
-                    current_url = None
+            source_map = {
+                file: url for url, file in _SOURCE_ENTRY_RE.findall(f.read())
+            }
+
+    if filenames is None:
+        # One directory pass; skip anything _load_one would ignore anyway
+        with os.scandir(folder_name) as it:
+            entries = [
+                (entry.path, entry.name)
+                for entry in it
+                if entry.name.endswith((".md", RES_SUFFIX, ".pdf"))
+                and entry.name != "SOURCES.md"
+                and entry.is_file()
+            ]
+    else:
+        entries = [(os.path.join(folder_name, name), name) for name in filenames]
 
     # Process each file in the folder
-    for filename in os.listdir(folder_name):
-        filepath = os.path.join(folder_name, filename)
-        source_url = source_map.get(filename, filename)
-
-        if filename.endswith(".md") and filename != "SOURCES.md":
-            try:
-                with open(filepath, "r", encoding="utf-8") as f:
-                    content = f.read()
-                if content.strip():
-                    doc = Document(
-                        page_content=content,
-                        metadata={"source": source_url, "file": filename},
-                    )
-                    all_documents.append(doc)
-            except Exception:
-                print(f" ! Error processing {filename}")
-                continue
-
-        elif filename.endswith(".pdf"):
-            try:
-                reader = PdfReader(filepath)
-                pdf_text = ""
-                for page in reader.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        pdf_text += page_text + "\n"
-                if pdf_text.strip():
-                    doc = Document(
-                        page_content=pdf_text,
-                        metadata={"source": source_url, "file": filename},
-                    )
-                    all_documents.append(doc)
-            except Exception:
-                print(f" ! Error processing PDF {filename}")
-                continue
-
-    if not all_documents:
-        all_documents = [
-            Document(page_content="No content found", metadata={"source": "fallback"})
+    per_file = await asyncio.gather(
+        *[
+            _load_one(filepath, filename, source_map.get(filename, filename))
+            for filepath, filename in entries
         ]
+    )
 
-    # Split documents into chunks
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
-        length_function=len,
+    return dedupe_chunks([chunk for chunks in per_file for chunk in chunks])
+
+
+def _simhash(text: str) -> int:
+    """64-bit SimHash of the text's words: each bit is a majority vote."""
+    tokens = _WORD_RE.findall(text.lower())
+    if not tokens:
+        return 0
+    digests = b"".join(
+        hashlib.blake2b(token.encode(), digest_size=8).digest() for token in tokens
     )
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8)).reshape(-1, 64)
+    votes = bits.sum(axis=0) * 2 > len(tokens)
+    return int.from_bytes(np.packbits(votes).tobytes(), "big")
 
-    chunks = text_splitter.split_documents(all_documents)
 
-    # Create FAISS vector store
-    vectorstore = FAISS.from_documents(chunks, embeddings)
+def dedupe_chunks(chunks: list[Document]) -> list[Document]:
+    """Drop chunks whose SimHash is within SIMHASH_MAX_DISTANCE bits of a kept one.
 
-    return vectorstore
+    Byte-identical chunks are caught first by a content digest, without
+    computing a SimHash. Signatures are bucketed on their top 16 bits, so
+    each remaining chunk is only compared against the few signatures
+    sharing its prefix.
+    """
+    seen_digests = set()
+    buckets: dict[int, list[int]] = {}
+    unique = []
+    for chunk in chunks:
+        digest = hashlib.blake2b(chunk.page_content.encode(), digest_size=16).digest()
+        if digest in seen_digests:
+            continue
+        seen_digests.add(digest)
+
+        signature = _simhash(chunk.page_content)
+        bucket = buckets.setdefault(signature >> 48, [])
+        if any(
+            (signature ^ other).bit_count() <= SIMHASH_MAX_DISTANCE for other in bucket
+        ):
+            continue
+        bucket.append(signature)
+        unique.append(chunk)
+    return unique
+
+
+async def _embed_batches(texts: list[str]) -> list[list[float]]:
+    semaphore = asyncio.Semaphore(EMBED_CONCURRENCY)
+
+    async def embed_batch(batch: list[str]) -> list[list[float]]:
+        async with semaphore:
+            return await _loop_embeddings().aembed_documents(batch)
+
+    batches = [
+        texts[i : i + EMBED_BATCH_SIZE] for i in range(0, len(texts), EMBED_BATCH_SIZE)
+    ]
+    results = await asyncio.gather(*[embed_batch(batch) for batch in batches])
+    return [vector for batch_vectors in results for vector in batch_vectors]
+
+
+async def embed_texts(texts: list[str]) -> list[list[float]]:
+    """Embed texts in concurrent batches of EMBED_BATCH_SIZE.
+
+    Chunks embedded before (same text and model) are served from the on-disk
+    embedding cache; only the misses reach the model.
+    """
+    return await cached_embed(texts, EMBEDDING_MODEL, _embed_batches)
 
 
-async def ai_main(vectorstore: FAISS, user_prompt: str) -> tuple[str, list[str]]:
-    """Retrieve relevant information and generate response using Gemma 3."""
+def _train_and_add(index: faiss.Index, xb: np.ndarray, nlist: int) -> faiss.Index:
+    """Train an IVF index on a sample of `xb`, then add all of `xb`.
 
-    # Retrieve relevant documents
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 5})
-    relevant_docs = await retriever.ainvoke(user_prompt)
+    Both steps run on the first GPU when faiss sees one; the result is
+    always a CPU index so it can be saved and searched as usual.
+    """
+    sample = xb
+    sample_size = nlist * IVF_TRAIN_POINTS_PER_LIST
+    if len(xb) > sample_size:
+        rng = np.random.default_rng(0)
+        sample = xb[rng.choice(len(xb), sample_size, replace=False)]
+
+    if getattr(faiss, "get_num_gpus", lambda: 0)() > 0:
+        resources = faiss.StandardGpuResources()
+        gpu_index = faiss.index_cpu_to_gpu(resources, 0, index)
+        gpu_index.train(sample)
+        gpu_index.add(xb)
+        return faiss.index_gpu_to_cpu(gpu_index)
+
+    index.train(sample)
+    index.add(xb)
+    return index
+
+
+def create_vectorstore(
+    texts: list[str], vectors: list[list[float]], metadatas: list[dict]
+) -> FAISS:
+    """Wrap precomputed embeddings in a FAISS store backed by an ANN index.
+
+    HNSW keeps retrieval sub-linear as the adaptive loop grows the corpus,
+    at near-exact recall for k=5. From IVFPQ_MIN_VECTORS chunks on, an
+    IVFPQ index stores each vector as PQ_M bytes instead of full floats.
+    VECTOR_INDEX=sq8 selects an exhaustive 8-bit scalar-quantized index.
+    All indexes rank by inner product over normalized vectors (cosine).
+    """
+    xb = np.asarray(vectors, dtype="float32")
+    faiss.normalize_L2(xb)
+    n, d = xb.shape
+    metric = faiss.METRIC_INNER_PRODUCT
+
+    if VECTOR_INDEX == "sq8":
+        index = faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_8bit, metric)
+        index.train(xb)
+        index.add(xb)
+    elif n >= IVFPQ_MIN_VECTORS and d % PQ_M == 0:
+        # ~4*sqrt(N) lists, keeping at least 39 training points per list
+        nlist = max(1, min(int(4 * math.sqrt(n)), n // 39))
+        index = _train_and_add(
+            faiss.index_factory(d, f"IVF{nlist},PQ{PQ_M}x8", metric), xb, nlist
+        )
+        index.nprobe = IVF_NPROBE
+    else:
+        index = faiss.IndexHNSWFlat(d, HNSW_M, metric)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+        index.add(xb)
+
+    ids = [str(uuid.uuid4()) for _ in texts]
+    docstore = InMemoryDocstore(
+        {
+            doc_id: Document(page_content=text, metadata=metadata)
+            for doc_id, text, metadata in zip(ids, texts, metadatas)
+        }
+    )
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=dict(enumerate(ids)),
+        **_STORE_OPTIONS,
+    )
 
-    # Combine the content
-    context = "\n\n".join([doc.page_content for doc in relevant_docs])
 
-    # Extract sources
-    sources = list(
-        set([doc.metadata.get("source", "unknown") for doc in relevant_docs])
+async def ai_finder(folder_name: str, topic: str = "") -> FAISS:
+    """Process scraped text and PDFs, create embeddings, and build FAISS vector store.
+
+    Stores live in memory only: every question scrapes into a fresh folder,
+    and chunk embeddings are already cached, so a rebuild skips the model.
+    """
+    chunks = await load_chunks(folder_name)
+
+    if not chunks:
+        chunks = [
+            Document(page_content="No content found", metadata={"source": "fallback"})
+        ]
+
+    texts = [chunk.page_content for chunk in chunks]
+
+    # Create FAISS vector store from batch-computed embeddings
+    vectorstore = create_vectorstore(
+        texts, await embed_texts(texts), [chunk.metadata for chunk in chunks]
     )
 
-    # Create prompt with context
-    full_prompt = f"""You are an answer engine that provides accurate, well-reasoned, and practical responses.
-        Use the provided context to ground your answer, but do not mention the context directly.
-        If the answer is uncertain, acknowledge briefly and provide the most likely correct information.
-        Organize your response for readability using sections or bullet points when helpful.
-        Prioritize: factual correctness, efficiency, and actionable advice.
-        Avoid asking follow-up questions.
-        Avoid phrases that weaken confidence (e.g., "this might help" -> "do this for better results").
-        Keep the tone direct, clear, and concise.
+    return vectorstore
 
-        Based on the following information:
 
-        {context}
+async def ai_finder_incremental(
+    vectorstore: FAISS, folder_name: str, filenames: list[str]
+) -> FAISS:
+    """Embed only the given files and add them to an existing vector store.
 
-        Answer the user's question: {user_prompt}
-        """
+    Args:
+        vectorstore: Store previously built by ai_finder for the same folder
+        folder_name: Scrape folder the new files live in
+        filenames: Files written since the store was built
 
-    try:
-        response = llm.invoke(full_prompt)
-        return response, sources
-    except Exception:
-        return "RAG failed", []
+    Returns:
+        The same vector store, updated in place
+    """
+    chunks = await load_chunks(folder_name, filenames)
+    if not chunks:
+        return vectorstore
+
+    texts = [chunk.page_content for chunk in chunks]
+    vectors = await embed_texts(texts)
+    vectorstore.add_embeddings(
+        list(zip(texts, vectors)), metadatas=[chunk.metadata for chunk in chunks]
+    )
+
+    return vectorstore
+
+
+# Fixed instruction block at the start of every answer prompt. It is plain
+# text with no interpolation, so each request begins with the exact same
+# bytes and Ollama can reuse the KV cache it computed for them.
+SYSTEM_PREFIX = """You are an answer engine that provides accurate, well-reasoned, and practical responses.
+Use the provided context to ground your answer, but do not mention the context directly.
+If the answer is uncertain, acknowledge briefly and provide the most likely correct information.
+Organize your response for readability using sections or bullet points when helpful.
+Prioritize: factual correctness, efficiency, and actionable advice.
+Avoid asking follow-up questions.
+Avoid phrases that weaken confidence (e.g., "this might help" -> "do this for better results").
+Keep the tone direct, clear, and concise.
 
+Based on the following information:
 
-def ai_stream_response(vectorstore: FAISS, user_prompt: str):
-    """Generate streaming response with source attribution."""
+"""
 
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 5})
-    relevant_docs = retriever.invoke(user_prompt)
 
-    # Combine the content
-    context = "\n\n".join([doc.page_content for doc in relevant_docs])
+def _build_prompt(docs: list[Document], user_prompt: str) -> str:
+    """Assemble the answer prompt in one join.
+
+    Only the retrieved chunks and the question vary, and both come after
+    SYSTEM_PREFIX.
+    """
+    parts = [SYSTEM_PREFIX]
+    for i, doc in enumerate(docs):
+        if i:
+            parts.append("\n\n")
+        parts.append(doc.page_content)
+    parts += ["\n\nAnswer the user's question: ", user_prompt, "\n"]
+    return "".join(parts)
+
+
+async def _retrieve(
+    vectorstore: FAISS, user_prompt: str, keywords: list[str] | None = None
+) -> tuple[list[Document], list[str]]:
+    """Retrieve the top chunks for a question.
+
+    With search keywords, the question and up to two keyword variants are
+    embedded in one batch and their result lists are merged by reciprocal
+    rank fusion, so chunks several queries agree on rank first.
+
+    Returns:
+        Tuple of (chunks in rank order, unique source URLs in rank order)
+    """
+    queries = [user_prompt] + (keywords or [])[:2]
+    vectors = await _loop_embeddings().aembed_documents(queries)
+
+    # Index searches run off the event loop so streaming and other
+    # sessions' work keep going meanwhile
+    results = await asyncio.gather(
+        *[
+            vectorstore.asimilarity_search_by_vector(vector, k=RETRIEVAL_K)
+            for vector in vectors
+        ]
+    )
+
+    scores: dict[str, float] = {}
+    docs_by_text: dict[str, Document] = {}
+    for docs in results:
+        for rank, doc in enumerate(docs):
+            docs_by_text.setdefault(doc.page_content, doc)
+            scores[doc.page_content] = scores.get(doc.page_content, 0.0) + 1 / (
+                RRF_K + rank + 1
+            )
+    ranked = sorted(scores, key=scores.get, reverse=True)[:RETRIEVAL_K]
+    relevant_docs = [docs_by_text[text] for text in ranked]
 
-    # Collect unique source URLs
     sources = list(
         dict.fromkeys(doc.metadata.get("source", "unknown") for doc in relevant_docs)
     )
+    return relevant_docs, sources
 
-    # Create prompt with context
-    full_prompt = f"""You are an answer engine that provides accurate, well-reasoned, and practical responses.
-        Use the provided context to ground your answer, but do not mention the context directly.
-        If the answer is uncertain, acknowledge briefly and provide the most likely correct information.
-        Organize your response for readability using sections or bullet points when helpful.
-        Prioritize: factual correctness, efficiency, and actionable advice.
-        Avoid asking follow-up questions.
-        Avoid phrases that weaken confidence (e.g., "this might help" -> "do this for better results").
-        Keep the tone direct, clear, and concise.
 
-        Based on the following information:
+async def ai_main(
+    vectorstore: FAISS,
+    user_prompt: str,
+    on_token: Callable[[str], None] | None = None,
+    keywords: list[str] | None = None,
+) -> tuple[str, list[str]]:
+    """Retrieve relevant information and generate response using Gemma 3.
 
-        {context}
+    Args:
+        vectorstore: Store to retrieve context from
+        user_prompt: The user's question
+        on_token: Called with each generated chunk as soon as it arrives
+        keywords: Search keywords used as extra retrieval queries
 
-        Answer the user's question: {user_prompt}
-        """
+    Returns:
+        Tuple of (full response, source URLs)
+    """
+    relevant_docs, sources = await _retrieve(vectorstore, user_prompt, keywords)
+    full_prompt = _build_prompt(relevant_docs, user_prompt)
 
     try:
-        for chunk in llm.stream(full_prompt):
-            yield chunk
+        chunks = []
+        async for chunk in _loop_llm().astream(full_prompt):
+            chunks.append(chunk)
+            if on_token:
+                on_token(chunk)
+        return "".join(chunks), sources
+    except Exception:
+        return "RAG failed", []
 
-        # Append sources at the end
-        yield "\n\n---\n**Sources:**\n"
-        for i, src in enumerate(sources, 1):
-            if src.startswith("http"):
-                yield f"{i}. [{src}]({src})\n"
-            else:
-                yield f"{i}. {src}\n"
 
-    except Exception:
-        yield "RAG failed"
+def format_sources(sources: list[str]) -> str:
+    """Render source URLs as the Markdown list shown under an answer."""
+    if not sources:
+        return ""
+    return "\n\n---\n**Sources:**\n" + "".join(
+        f"{i}. [{src}]({src})\n" if src.startswith("http") else f"{i}. {src}\n"
+        for i, src in enumerate(sources, 1)
+    )
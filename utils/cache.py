@@ -0,0 +1,206 @@
+import atexit
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+import faiss
+import numpy as np
+
+CACHE_DIR = os.getenv("SCOUTLY_CACHE_DIR", ".cache")
+RESPONSE_TTL = 7 * 24 * 3600  # One week
+PAGE_TTL = 7 * 24 * 3600  # One week
+SIMILARITY_THRESHOLD = 0.95
+
+_conn: sqlite3.Connection | None = None
+# The connection is shared by every Streamlit session thread
+_lock = threading.Lock()
+
+
+def _db() -> sqlite3.Connection:
+    """Open (once) the SQLite database backing the response and page caches."""
+    global _conn
+    if _conn is None:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        _conn = sqlite3.connect(
+            os.path.join(CACHE_DIR, "responses.db"), check_same_thread=False
+        )
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, payload TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "url TEXT PRIMARY KEY, text TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+    return _conn
+
+
+def prompt_key(prompt: str, model: str) -> str:
+    """Hash a normalized prompt together with the model that answers it."""
+    normalized = " ".join(prompt.lower().split())
+    return hashlib.sha256(f"{model}:{normalized}".encode()).hexdigest()
+
+
+def get_response(prompt_hash: str) -> dict | None:
+    """Return the cached {"text", "sources"} payload, or None on a miss."""
+    with _lock:
+        row = _db().execute(
+            "SELECT payload, expires_at FROM responses WHERE key = ?", (prompt_hash,)
+        ).fetchone()
+    if row is None or row[1] < time.time():
+        return None
+    return json.loads(row[0])
+
+
+def put_response(
+    prompt_hash: str, text: str, sources: list[str], expire: float = RESPONSE_TTL
+) -> None:
+    """Store a finished response so identical prompts skip the pipeline."""
+    payload = json.dumps({"text": text, "sources": sources})
+    with _lock:
+        conn = _db()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, payload, expires_at) VALUES (?, ?, ?)",
+            (prompt_hash, payload, time.time() + expire),
+        )
+        conn.commit()
+
+
+def get_pages(urls: list[str]) -> dict[str, str]:
+    """Return cached extracted text for whichever of the URLs are fresh."""
+    found = {}
+    now = time.time()
+    with _lock:
+        conn = _db()
+        # Stay well below SQLite's bound-parameter limit
+        for i in range(0, len(urls), 500):
+            batch = urls[i : i + 500]
+            rows = conn.execute(
+                f"SELECT url, text FROM pages WHERE url IN ({','.join('?' * len(batch))}) "
+                "AND expires_at >= ?",
+                [*batch, now],
+            ).fetchall()
+            found.update(rows)
+    return found
+
+
+def put_pages(pages: dict[str, str], expire: float = PAGE_TTL) -> None:
+    """Store extracted page text so later scrapes of the same URLs skip the fetch."""
+    if not pages:
+        return
+    expires_at = time.time() + expire
+    with _lock:
+        conn = _db()
+        conn.executemany(
+            "INSERT OR REPLACE INTO pages (url, text, expires_at) VALUES (?, ?, ?)",
+            [(url, text, expires_at) for url, text in pages.items()],
+        )
+        conn.commit()
+
+
+class SemanticCache:
+    """Map prompt embeddings to cached values by cosine similarity.
+
+    Vectors are L2-normalized and kept in a FAISS inner-product index, so a
+    search score is the cosine similarity to the closest stored prompt.
+    Index positions and `values` stay aligned; when bounded, the oldest
+    position is the least recently used entry.
+    """
+
+    def __init__(
+        self,
+        name: str | None = None,
+        threshold: float = SIMILARITY_THRESHOLD,
+        max_entries: int | None = None,
+        save_every: int = 8,
+    ):
+        """
+        Args:
+            name: File stem under CACHE_DIR to persist to (in-memory only if None)
+            threshold: Minimum cosine similarity for a hit
+            max_entries: Evict least recently used entries beyond this size
+            save_every: Write to disk after this many adds, so a killed
+                process loses at most that many entries
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.save_every = save_every
+        self._unsaved_adds = 0
+        self.path = os.path.join(CACHE_DIR, name) if name else None
+        self.index: faiss.Index | None = None
+        self.values: list = []
+        self._dirty = False
+        self._lock = threading.Lock()
+
+        if self.path:
+            if os.path.exists(self.path + ".faiss"):
+                try:
+                    self.index = faiss.read_index(self.path + ".faiss")
+                    with open(self.path + ".pkl", "rb") as f:
+                        self.values = pickle.load(f)
+                except Exception:
+                    self.index, self.values = None, []
+            atexit.register(self.save)
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        q = np.asarray([vector], dtype="float32")
+        faiss.normalize_L2(q)
+        return q
+
+    def lookup(self, vector):
+        """Return the value stored for the most similar prompt, if close enough."""
+        with self._lock:
+            if self.index is None or self.index.ntotal == 0:
+                return None
+            scores, ids = self.index.search(self._normalize(vector), 1)
+            i = int(ids[0][0])
+            if i < 0 or scores[0][0] < self.threshold:
+                return None
+            value = self.values[i]
+            if self.max_entries:
+                # Move the hit to the most recently used end
+                stored = self.index.reconstruct(i).reshape(1, -1)
+                self.index.remove_ids(np.array([i], dtype="int64"))
+                self.index.add(stored)
+                self.values.append(self.values.pop(i))
+                self._dirty = True
+            return value
+
+    def add(self, vector, value) -> None:
+        q = self._normalize(vector)
+        with self._lock:
+            if self.index is None:
+                self.index = faiss.IndexFlatIP(q.shape[1])
+            self.index.add(q)
+            self.values.append(value)
+            self._dirty = True
+            if self.max_entries and self.index.ntotal > self.max_entries:
+                excess = self.index.ntotal - self.max_entries
+                self.index.remove_ids(np.arange(excess, dtype="int64"))
+                del self.values[:excess]
+            self._unsaved_adds += 1
+            due = self._unsaved_adds >= self.save_every
+
+        # atexit hooks don't run when the process is killed, so don't wait
+        # for them to persist new entries
+        if due:
+            self.save()
+
+    def save(self) -> None:
+        """Persist the index and its values next to the response cache."""
+        with self._lock:
+            # Unchanged caches are not rewritten, so processes that only
+            # imported this module (e.g. pool workers) never clobber the file
+            if not self.path or self.index is None or not self._dirty:
+                return
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            faiss.write_index(self.index, self.path + ".faiss")
+            with open(self.path + ".pkl", "wb") as f:
+                pickle.dump(self.values, f)
+            self._dirty = False
+            self._unsaved_adds = 0
@@ -0,0 +1,74 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Awaitable, Callable
+
+import numpy as np
+
+from utils.cache import CACHE_DIR
+
+_conn: sqlite3.Connection | None = None
+_lock = threading.Lock()
+
+
+def _db() -> sqlite3.Connection:
+    """Open (once) the SQLite database holding chunk embeddings."""
+    global _conn
+    if _conn is None:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        _conn = sqlite3.connect(
+            os.path.join(CACHE_DIR, "embeddings.db"), check_same_thread=False
+        )
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+    return _conn
+
+
+async def cached_embed(
+    texts: list[str],
+    model: str,
+    embed: Callable[[list[str]], Awaitable[list[list[float]]]],
+) -> list[list[float]]:
+    """Embed texts, reusing vectors already computed for identical text and model.
+
+    Args:
+        texts: Texts to embed
+        model: Embedding model id, part of the cache key
+        embed: Batch embedding function called once with all cache misses
+
+    Returns:
+        One vector per input text, in input order
+    """
+    keys = [hashlib.sha256(f"{model}:{t}".encode()).hexdigest() for t in texts]
+
+    found = {}
+    with _lock:
+        conn = _db()
+        # Stay well below SQLite's bound-parameter limit
+        for i in range(0, len(keys), 500):
+            batch = keys[i : i + 500]
+            rows = conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                batch,
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+    misses = list(dict.fromkeys(k for k in keys if k not in found))
+    if misses:
+        miss_texts = {k: t for k, t in zip(keys, texts) if k not in found}
+        vectors = await embed([miss_texts[k] for k in misses])
+        rows = []
+        for key, vector in zip(misses, vectors):
+            found[key] = vector
+            rows.append((key, np.asarray(vector, dtype=np.float32).tobytes()))
+        with _lock:
+            conn = _db()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows
+            )
+            conn.commit()
+
+    return [found[k] for k in keys]
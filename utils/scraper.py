@@ -1,94 +1,314 @@
 import os
+import atexit
+import json
+import random
+import re
 import httpx
 import asyncio
 import trafilatura
-from concurrent.futures import ThreadPoolExecutor
+from selectolax.lexbor import LexborHTMLParser as HTMLParser
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 from typing import Optional
 import uuid
 import time
+import zstandard
 from ddgs import DDGS
+from ddgs.exceptions import RatelimitException
+
+from utils.cache import get_pages, put_pages
+
+# trafilatura parsing is CPU-bound pure Python, so it runs in processes;
+# file writes use a small thread pool, and blocking DuckDuckGo calls get
+# their own so a slow search never holds up writes (or vice versa)
+_parse_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 4)
+_io_pool = ThreadPoolExecutor(max_workers=8)
+_search_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="ddgs")
+
+# Browser-like headers sent with every request from the shared client
+HEADERS = httpx.Headers(
+    {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.5",
+        "Accept-Encoding": "gzip, deflate, br",
+        "DNT": "1",
+        "Connection": "keep-alive",
+    }
+)
+
+# Elements dropped before taking page text (site headers only outside an
+# <article>, whose own header holds its title), and the least text the fast
+# extractor must find before trafilatura is skipped
+_BOILERPLATE_SELECTOR = "script, style, noscript, nav, footer, aside, form"
+_PAGE_BOILERPLATE_SELECTOR = _BOILERPLATE_SELECTOR + ", header"
+MIN_EXTRACT_CHARS = 200
+
+# Block elements that end a line of extracted text. Breaks are marked with
+# U+2029 so they survive collapsing the page's own whitespace
+_BLOCK_SELECTOR = (
+    "p, div, section, h1, h2, h3, h4, h5, h6, li, pre, blockquote, "
+    "tr, dt, dd, figcaption, br"
+)
+_BLOCK_BREAK = "\u2029"
+_HTML_SPACE_RE = re.compile(r"[ \t\n\r\f\v\xa0]+")
+
+# Connections the shared client opens at once; page fetches are capped to match
+MAX_CONNECTIONS = 30
+
+# Bytes of HTML read per page; the rest of an oversized page is never downloaded
+MAX_HTML_SIZE = 2 * 1024 * 1024
+
+# <meta charset="..."> or http-equiv Content-Type charset near the top of a page
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w.:-]+)""", re.I)
+
+# Response types worth parsing; anything else is dropped before its body is read
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+# DuckDuckGo queries in flight at once, and attempts per rate-limited query
+SEARCH_CONCURRENCY = 5
+SEARCH_RETRIES = 3
+
+# Sidecar listing the URLs already in a folder's SOURCES.md
+SOURCES_INDEX = "SOURCES.index.json"
+
+# Holds the next free RES_<n> number, so appending never lists the folder
+NEXT_INDEX_FILE = ".index"
+
+# Scraped pages are stored zstd-compressed; boilerplate-heavy markdown
+# shrinks several times over
+RES_SUFFIX = ".md.zst"
+ZSTD_LEVEL = 3
+
+# One pooled client per event loop, so keep-alive connections survive across
+# scrape batches (httpx clients cannot be shared between loops)
+_clients: dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared scraping client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    # Drop clients whose loops are gone
+    for stale in [lp for lp in list(_clients) if lp.is_closed()]:
+        _clients.pop(stale, None)
+
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        # Configure client with optimal settings for scraping
+        limits = httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=15,
+            keepalive_expiry=30.0,
+        )
+        # HTTP/1.1: scraped URLs are spread over many one-off hosts, so
+        # HTTP/2 multiplexing never kicks in and only adds framing overhead
+        client = httpx.AsyncClient(
+            headers=HEADERS,
+            timeout=8,
+            follow_redirects=True,
+            limits=limits,
+        )
+        _clients[loop] = client
+    return client
+
 
-# Shared thread pool for CPU-bound work (trafilatura parsing, file I/O)
-_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 4)
+async def close_client() -> None:
+    """Close the running loop's shared client, if one was created."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
 
-HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; AI-scraper/1.0)"}
+
+@atexit.register
+def _close_clients() -> None:
+    for loop, client in list(_clients.items()):
+        if not loop.is_closed() and not loop.is_running():
+            loop.run_until_complete(client.aclose())
 
 
 def write_sources(folder_name: str, sources: list[dict]) -> None:
-    """Write SOURCES.md with all source URLs and titles."""
-    filepath = os.path.join(folder_name, "SOURCES.md")
+    """Append new sources to SOURCES.md.
 
-    # Load existing sources if file exists
-    existing = []
-    if os.path.exists(filepath):
+    URLs already listed are tracked in a SOURCES.index.json sidecar, so each
+    call only writes the new entries instead of re-reading and rewriting
+    the whole file.
+    """
+    if not sources:
+        return
+
+    filepath = os.path.join(folder_name, "SOURCES.md")
+    index_path = os.path.join(folder_name, SOURCES_INDEX)
+
+    # Load the URLs already listed
+    known = []
+    if os.path.exists(index_path):
+        with open(index_path, "r", encoding="utf-8") as f:
+            known = json.load(f)["urls"]
+    elif os.path.exists(filepath):
+        # Folder written before the index existed: recover it once
         with open(filepath, "r", encoding="utf-8") as f:
-            content = f.read()
-        # Parse existing entries to avoid duplicates
-        for line in content.split("\n"):
-            if line.startswith("- URL: "):
-                existing.append(line.split("- URL: ")[1].strip())
-
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write("# Sources\n\n")
-        f.write(f"_Generated: {time.strftime('%Y-%m-%d %H:%M:%S')}_\n\n")
-
-        seen_urls = set(existing)
-        idx = 1
-
-        # Write existing first
-        for url in existing:
-            f.write(f"## Source {idx}\n")
-            f.write(f"- URL: {url}\n\n")
-            idx += 1
-
-        # Write new sources
-        for source in sources:
-            url = source.get("url", "")
-            if url in seen_urls:
-                continue
-            seen_urls.add(url)
-
-            title = source.get("title", "Unknown")
-            file_ref = source.get("file", "")
-            source_type = source.get("type", "webpage")
-
-            f.write(f"## Source {idx}\n")
-            f.write(f"- Title: {title}\n")
-            f.write(f"- URL: {url}\n")
-            f.write(f"- Type: {source_type}\n")
-            if file_ref:
-                f.write(f"- File: {file_ref}\n")
-            f.write("\n")
-            idx += 1
-
-
-async def download_pdf(url: str, folder_name: str, index: int) -> bool:
-    """Download a PDF file to the folder."""
+            known = [
+                line.partition("- URL: ")[2].strip()
+                for line in f
+                if line.startswith("- URL: ")
+            ]
+
+    # Build the new entries in memory and append them in one write
+    out = []
+    if not os.path.exists(filepath):
+        out.append("# Sources\n\n")
+        out.append(f"_Generated: {time.strftime('%Y-%m-%d %H:%M:%S')}_\n\n")
+    seen_urls = set(known)
+
+    for source in sources:
+        url = source.get("url", "")
+        if url in seen_urls:
+            continue
+        seen_urls.add(url)
+        known.append(url)
+
+        title = source.get("title", "Unknown")
+        file_ref = source.get("file", "")
+        source_type = source.get("type", "webpage")
+
+        out.append(
+            f"## Source {len(known)}\n"
+            f"- Title: {title}\n"
+            f"- URL: {url}\n"
+            f"- Type: {source_type}\n"
+        )
+        if file_ref:
+            out.append(f"- File: {file_ref}\n")
+        out.append("\n")
+
+    if not out:
+        return
+
+    with open(filepath, "a", encoding="utf-8") as f:
+        f.write("".join(out))
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump({"urls": known, "count": len(known)}, f)
+
+
+async def download_pdf(
+    url: str,
+    folder_name: str,
+    index: int,
+    session: httpx.AsyncClient | None = None,
+) -> bool:
+    """Download a PDF file to the folder.
+
+    Uses the shared scraping client unless a session is given, so PDF
+    downloads reuse its keep-alive connections.
+    """
+    session = session or get_client()
+    filepath = os.path.join(folder_name, f"{index}.pdf")
     try:
-        async with httpx.AsyncClient(
+        async with session.stream(
+            "GET",
+            url,
             timeout=30,
-            follow_redirects=True,
-            headers={
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-            },
-        ) as session:
-            response = await session.get(url)
+        ) as response:
             response.raise_for_status()
 
             content_type = response.headers.get("content-type", "").lower()
             if "pdf" not in content_type and not url.lower().endswith(".pdf"):
                 return False
 
-            filepath = os.path.join(folder_name, f"{index}.pdf")
+            # Write chunks as they arrive instead of buffering the whole file
             with open(filepath, "wb") as f:
-                f.write(response.content)
-            return True
-    except Exception:
+                async for chunk in response.aiter_bytes(chunk_size=64 * 1024):
+                    f.write(chunk)
+        return True
+    except (Exception, asyncio.CancelledError) as e:
+        # Don't leave a truncated PDF behind for the loader to choke on
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        if isinstance(e, asyncio.CancelledError):
+            raise
         return False
 
 
-def extract_text(html: str) -> str:
-    """Extract clean text from HTML using trafilatura."""
+async def _is_pdf(url: str, session: httpx.AsyncClient) -> bool:
+    """Whether a URL serves a PDF, judged from a HEAD response's content type.
+
+    A .pdf extension also counts, matching what download_pdf accepts, and
+    decides alone when the server rejects HEAD.
+    """
+    try:
+        response = await session.head(url, timeout=5)
+        response.raise_for_status()
+        content_type = response.headers.get("content-type", "").lower()
+        # Many hosts serve PDFs as application/octet-stream
+        return "pdf" in content_type or url.lower().endswith(".pdf")
+    except Exception:
+        return url.lower().endswith(".pdf")
+
+
+def _decode_html(html: bytes, charset: Optional[str] = None) -> str:
+    """Decode a page using its header charset, else its meta tag, else UTF-8."""
+    if not charset:
+        match = _META_CHARSET_RE.search(html, 0, 4096)
+        charset = match.group(1).decode("ascii") if match else "utf-8"
+    try:
+        return html.decode(charset, errors="replace")
+    except LookupError:
+        return html.decode("utf-8", errors="replace")
+
+
+def _densest_paragraph_parent(root):
+    """Return the element whose direct <p> children hold the most text, if any."""
+    totals = {}
+    for paragraph in root.css("p"):
+        parent = paragraph.parent
+        if parent is not None:
+            totals[parent] = totals.get(parent, 0) + len(paragraph.text(strip=True))
+    return max(totals, key=totals.get) if totals else None
+
+
+def _block_text(root) -> str:
+    """Text of a subtree with one line per block element.
+
+    Inline elements (links, emphasis) stay inside their sentence.
+    """
+    for node in root.css(_BLOCK_SELECTOR):
+        node.insert_after(_BLOCK_BREAK)
+    text = _HTML_SPACE_RE.sub(" ", root.text(deep=True))
+    return "\n".join(
+        line for part in text.split(_BLOCK_BREAK) if (line := part.strip())
+    )
+
+
+def extract_text(html: bytes, charset: Optional[str] = None) -> str:
+    """Extract clean text from HTML.
+
+    A selectolax pass (Lexbor C parser, no scoring heuristics) takes the
+    page's <article>, or else the container with the most paragraph text;
+    trafilatura's slower full pipeline is only used when neither exists or
+    yields too little text. Lexbor assumes UTF-8, so the page is decoded
+    here (in the worker process) from the response's charset or its meta
+    tag first.
+    """
+    html = _decode_html(html, charset)
+    try:
+        tree = HTMLParser(html)
+        root = tree.css_first("article")
+        if root is None and tree.body:
+            # Drop site chrome first so its paragraphs can't win
+            for node in tree.body.css(_PAGE_BOILERPLATE_SELECTOR):
+                node.decompose()
+            root = _densest_paragraph_parent(tree.body)
+        if root:
+            # Only the chosen root's text is kept, so strip boilerplate
+            # from that subtree instead of walking the whole document
+            for node in root.css(_BOILERPLATE_SELECTOR):
+                node.decompose()
+            text = _block_text(root)
+            if len(text) >= MIN_EXTRACT_CHARS:
+                return text
+    except Exception:
+        pass
+
     try:
         text = trafilatura.extract(html, output_format="markdown")
         return text if text else ""
@@ -96,67 +316,95 @@ def extract_text(html: str) -> str:
         return ""
 
 
-async def fetch_html(url: str, session: httpx.AsyncClient) -> tuple[str, Optional[str]]:
-    """Fetch raw HTML from a single URL using httpx with optimized settings."""
+async def fetch_html(
+    url: str, session: httpx.AsyncClient
+) -> tuple[str, Optional[bytes], Optional[str]]:
+    """Fetch raw HTML from a single URL, reading at most MAX_HTML_SIZE bytes.
+
+    Returns:
+        tuple of (url, body bytes or None, charset from the Content-Type header)
+    """
     try:
-        response = await session.get(
-            url,
-            headers={
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                "Accept-Language": "en-US,en;q=0.5",
-                "Accept-Encoding": "gzip, deflate, br",
-                "DNT": "1",
-                "Connection": "keep-alive",
-            },
-            timeout=8,
-            follow_redirects=True,
-        )
-        response.raise_for_status()
-        return url, response.text
+        async with session.stream(
+            "GET", url, timeout=8, follow_redirects=True
+        ) as response:
+            response.raise_for_status()
+            content_type = response.headers.get("content-type", "")
+            media_type = content_type.split(";", 1)[0].strip().lower()
+            if media_type and media_type not in HTML_CONTENT_TYPES:
+                return url, None, None
+            body = bytearray()
+            async for chunk in response.aiter_bytes(65536):
+                body += chunk
+                if len(body) >= MAX_HTML_SIZE:
+                    break
+        return url, bytes(body[:MAX_HTML_SIZE]), response.charset_encoding
     except Exception:
-        return url, None
+        return url, None, None
 
 
 async def scrape_urls(urls: list[str]) -> dict[str, Optional[str]]:
-    """Fetch and parse multiple URLs concurrently with optimized settings."""
-    results = {}
-    loop = asyncio.get_event_loop()
+    """Fetch and parse multiple URLs concurrently with optimized settings.
 
-    # Configure client with optimal settings for scraping
-    limits = httpx.Limits(
-        max_connections=30, max_keepalive_connections=15, keepalive_expiry=30.0
-    )
+    Each page is handed to the parse pool as soon as its own fetch
+    finishes, so parsing overlaps with the slower fetches still in flight.
+    """
+    if not urls:
+        return {}
 
-    async with httpx.AsyncClient(
-        timeout=8,
-        follow_redirects=True,
-        limits=limits,
-        http2=True,  # Enable HTTP/2 for faster requests
-    ) as session:
-        # Fetch all URLs concurrently with semaphore to limit concurrency
-        semaphore = asyncio.Semaphore(10)
+    loop = asyncio.get_running_loop()
 
-        async def fetch_with_limit(url):
-            async with semaphore:
-                return await fetch_html(url, session)
+    session = get_client()
 
-        fetch_tasks = [fetch_with_limit(url) for url in urls]
-        html_results = await asyncio.gather(*fetch_tasks)
+    # Match the client's connection limit: a lower cap leaves connections
+    # idle, while queueing past it would count against the pool timeout
+    semaphore = asyncio.Semaphore(MAX_CONNECTIONS)
 
-    # Parse HTML in parallel using thread pool (trafilatura is CPU-bound)
-    async def extract_async(url: str, html: Optional[str]) -> tuple[str, Optional[str]]:
+    async def fetch_and_parse(url: str) -> tuple[str, Optional[str]]:
+        async with semaphore:
+            url, html, charset = await fetch_html(url, session)
         if not html:
             return url, None
-        text = await loop.run_in_executor(_executor, extract_text, html)
+        # Decode and parse HTML across processes (trafilatura is CPU-bound)
+        text = await loop.run_in_executor(_parse_pool, extract_text, html, charset)
         return url, text if text else None
 
-    extract_tasks = [extract_async(url, html) for url, html in html_results]
-    parsed_results = await asyncio.gather(*extract_tasks)
+    parsed_results = await asyncio.gather(*[fetch_and_parse(url) for url in urls])
+    return dict(parsed_results)
+
+
+def read_next_index(folder_name: str) -> int:
+    """Return the next free RES_<n> number in a scrape folder.
 
-    for url, text in parsed_results:
-        results[url] = text
+    Reads the stored counter; folders written before it existed are
+    scanned once for their highest RES_<n> file instead.
+    """
+    try:
+        with open(os.path.join(folder_name, NEXT_INDEX_FILE)) as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        pass
+    numbers = [
+        int(number)
+        for name in os.listdir(folder_name)
+        if name.startswith("RES_")
+        and (number := name[4:].split(".", 1)[0]).isdigit()
+    ]
+    return max(numbers, default=0) + 1
 
+
+def write_files(items: list[tuple[str, str]]) -> list[bool]:
+    """Write (filepath, content) pairs zstd-compressed; one success flag per file."""
+    # Compressor objects aren't thread-safe, so each call gets its own
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+    results = []
+    for filepath, content in items:
+        try:
+            with open(filepath, "wb") as f:
+                f.write(compressor.compress(content.encode("utf-8")))
+            results.append(True)
+        except Exception:
+            results.append(False)
     return results
 
 
@@ -172,7 +420,7 @@ async def use_scraper(
         search_results: List of search result dicts with 'href' key
         st: Search time for display
         folder_name: Optional existing folder to append to (for incremental scraping)
-        start_index: Starting index for file naming (continues from previous if folder_name provided)
+        start_index: Starting index for file naming (read from the folder's counter if omitted)
 
     Returns:
         tuple of (folder_name, next_available_index)
@@ -182,15 +430,11 @@ async def use_scraper(
     if folder_name is None:
         folder_name = f"scraped/{uuid.uuid4().hex[:8]}"
         start_index = 1
-    else:
-        existing = [
-            f
-            for f in os.listdir(folder_name)
-            if f.endswith(".md") and f.startswith("RES_")
-        ]
-        start_index = len(existing) + 1
+    elif start_index is None:
+        start_index = read_next_index(folder_name)
 
     os.makedirs(folder_name, exist_ok=True)
+    res_prefix = os.path.join(folder_name, "RES_")
 
     urls = [result["href"] for result in search_results]
     titles = {result["href"]: result.get("title", "") for result in search_results}
@@ -201,38 +445,33 @@ async def use_scraper(
         print(f"  {i}. {display_url}")
 
     t1 = time.time()
+    # Pages extracted in an earlier run are read back instead of re-fetched
+    cached = get_pages(urls)
+    to_fetch = [url for url in urls if url not in cached]
+    if cached:
+        print(f"⚡ {len(cached)} page(s) served from cache")
     print("⏳ Fetching and parsing pages...")
-    texts = await scrape_urls(urls)
+    fetched = await scrape_urls(to_fetch) if to_fetch else {}
+    put_pages({url: text for url, text in fetched.items() if text})
+    texts = {url: cached.get(url) or fetched.get(url) for url in urls}
 
-    # Write files in parallel using thread pool and track sources
+    # Write all files in one thread-pool job and track sources
     successful_scrapes = 0
     failed_scrapes = 0
     sources = []
 
-    def write_file(filepath: str, content: str) -> bool:
-        try:
-            with open(filepath, "w", encoding="utf-8") as f:
-                f.write(content)
-            return True
-        except Exception:
-            return False
-
-    write_futures = []
-    file_metadata = []  # Track (url, index) for each write task
+    writes = []  # (filepath, content) for each page to save
+    file_metadata = []  # Track (url, index) for each write
 
     for i, (url, text) in enumerate(texts.items(), start_index):
         if text:
-            filepath = os.path.join(folder_name, f"RES_{i}.md")
-            write_futures.append(
-                loop.run_in_executor(_executor, write_file, filepath, text)
-            )
+            writes.append((f"{res_prefix}{i}{RES_SUFFIX}", text))
             file_metadata.append((url, i))
         else:
             failed_scrapes += 1
 
-    # Await all file writes concurrently
-    if write_futures:
-        write_results = await asyncio.gather(*write_futures)
+    if writes:
+        write_results = await loop.run_in_executor(_io_pool, write_files, writes)
         for (url, idx), success in zip(file_metadata, write_results):
             if success:
                 successful_scrapes += 1
@@ -240,7 +479,7 @@ async def use_scraper(
                     {
                         "url": url,
                         "title": titles.get(url, ""),
-                        "file": f"RES_{idx}.md",
+                        "file": f"RES_{idx}{RES_SUFFIX}",
                         "type": "webpage",
                     }
                 )
@@ -261,7 +500,10 @@ async def use_scraper(
     print(f"  • Average per page: {avg_time:.2f}s")
     print(f"  • Speed: {len(urls) / scrape_time:.1f} pages/second\n")
 
-    next_index = start_index + successful_scrapes
+    # Failed pages still used up their numbers, so skip past all of them
+    next_index = start_index + len(texts)
+    with open(os.path.join(folder_name, NEXT_INDEX_FILE), "w") as f:
+        f.write(str(next_index))
     return folder_name, next_index
 
 
@@ -280,7 +522,6 @@ async def use_search(
     Returns:
         tuple of (list of result dicts, search time in seconds)
     """
-    ddgs = DDGS()
     t1 = time.time()
 
     # Add search type modifiers to improve results
@@ -292,53 +533,56 @@ async def use_search(
         "how-to": " guide tutorial",
     }
 
-    # Expand queries with modifiers and variations
-    expanded_queries = []
+    # Expand each query with its modifier variant, dropping case-insensitive
+    # duplicates as they are generated (first spelling wins)
+    modifier = query_modifiers.get(search_type, "")
+    unique = {}
     for query in queries:
-        modifier = query_modifiers.get(search_type, "")
-        # Original query
-        expanded_queries.append(query)
-        # With modifier
+        unique.setdefault(query.lower(), query)
         if modifier:
-            expanded_queries.append(query + modifier)
+            unique.setdefault((query + modifier).lower(), query + modifier)
+    unique_queries = list(unique.values())
 
-    # Remove duplicates while preserving order
-    seen = set()
-    unique_queries = []
-    for q in expanded_queries:
-        if q.lower() not in seen:
-            seen.add(q.lower())
-            unique_queries.append(q)
+    if not unique_queries:
+        return [], time.time() - t1
+
+    ddgs = DDGS()
+    semaphore = asyncio.Semaphore(SEARCH_CONCURRENCY)
 
     async def search_single(query: str) -> list:
         loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            None, lambda: ddgs.text(query, max_results=max_results_per_query)
-        )
-
-    # Run searches concurrently
+        async with semaphore:
+            for attempt in range(SEARCH_RETRIES):
+                try:
+                    return await loop.run_in_executor(
+                        _search_pool,
+                        partial(ddgs.text, query, max_results=max_results_per_query),
+                    )
+                except RatelimitException:
+                    if attempt == SEARCH_RETRIES - 1:
+                        break
+                    # Jittered exponential backoff
+                    await asyncio.sleep(0.5 * 2**attempt + random.random())
+        return []
+
+    # Run searches concurrently, a few at a time
     results_lists = await asyncio.gather(*[search_single(q) for q in unique_queries])
 
     t2 = time.time()
 
-    # Deduplicate results by URL
-    seen_urls = set()
-    unique_results = []
-
+    # Deduplicate results by URL, keeping the first hit for each
+    by_url = {}
     for sublist in results_lists:
         for r in sublist:
             url = r.get("href", "")
-            if url and url not in seen_urls:
-                seen_urls.add(url)
-                unique_results.append(
-                    {
-                        "title": r.get("title", ""),
-                        "href": url,
-                        "body": r.get("body", ""),
-                    }
-                )
+            if url and url not in by_url:
+                by_url[url] = {
+                    "title": r.get("title", ""),
+                    "href": url,
+                    "body": r.get("body", ""),
+                }
 
-    return unique_results, t2 - t1
+    return list(by_url.values()), t2 - t1
 
 
 async def search_pdfs(queries: list[str], folder_name: str, max_pdfs: int = 1) -> int:
@@ -352,6 +596,9 @@ async def search_pdfs(queries: list[str], folder_name: str, max_pdfs: int = 1) -
     Returns:
         Number of PDFs downloaded
     """
+    if not queries:
+        return 0
+
     pdf_queries = [f"{q} filetype:pdf" for q in queries]
     loop = asyncio.get_event_loop()
 
@@ -361,41 +608,35 @@ async def search_pdfs(queries: list[str], folder_name: str, max_pdfs: int = 1) -
     async def search_single_pdf(query: str) -> list:
         try:
             return await loop.run_in_executor(
-                _executor, lambda: ddgs.text(query, max_results=3)
+                _search_pool, partial(ddgs.text, query, max_results=3)
             )
         except Exception:
             return []
 
     all_results = await asyncio.gather(*[search_single_pdf(q) for q in pdf_queries])
 
-    # Collect unique PDF URLs
-    pdf_urls = []
-    seen = set()
-    for results in all_results:
-        for r in results:
-            href = r.get("href", "")
-            if (
-                href
-                and href not in seen
-                and (href.lower().endswith(".pdf") or "pdf" in href.lower())
-            ):
-                seen.add(href)
-                pdf_urls.append(href)
-                if len(pdf_urls) >= max_pdfs:
-                    break
-        if len(pdf_urls) >= max_pdfs:
-            break
+    # Collect unique PDF URLs in result order
+    candidates = dict.fromkeys(
+        href
+        for results in all_results
+        for r in results
+        if (href := r.get("href", "")) and "pdf" in href.lower()
+    )
 
-    pdf_urls = pdf_urls[:max_pdfs]
+    # Check candidates with HEAD requests first, so a page that merely
+    # mentions "pdf" doesn't take one of the max_pdfs download slots
+    session = get_client()
+    is_pdf = await asyncio.gather(*[_is_pdf(url, session) for url in candidates])
+    pdf_urls = [url for url, ok in zip(candidates, is_pdf) if ok][:max_pdfs]
 
     if not pdf_urls:
         return 0
 
     print(f"\n📄 Found {len(pdf_urls)} PDF(s), downloading...")
 
-    # Download all PDFs concurrently
+    # Download all PDFs concurrently over the shared client
     download_tasks = [
-        download_pdf(url, folder_name, i) for i, url in enumerate(pdf_urls, 1)
+        download_pdf(url, folder_name, i, session) for i, url in enumerate(pdf_urls, 1)
     ]
     download_results = await asyncio.gather(*download_tasks)
 
@@ -0,0 +1,82 @@
+import asyncio
+import atexit
+
+import httpx
+from langchain_core.embeddings import Embeddings
+
+
+class ServerEmbeddings(Embeddings):
+    """Embeddings from an OpenAI-compatible embedding server.
+
+    Works with Infinity (`infinity_emb v2 --model-id ...`) and Hugging Face
+    text-embeddings-inference, which batch concurrent requests dynamically
+    on the GPU.
+    """
+
+    def __init__(self, base_url: str, model: str, timeout: float = 60):
+        """
+        Args:
+            base_url: Server root serving POST /embeddings (e.g. http://localhost:7997)
+            model: Model id the server was started with
+            timeout: Seconds to wait for one batch
+        """
+        self.url = base_url.rstrip("/") + "/embeddings"
+        self.model = model
+        self.timeout = timeout
+        # One pooled client per event loop, so concurrent batches reuse
+        # keep-alive connections
+        self._clients: dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+        atexit.register(self._close_clients)
+
+    def _client(self) -> httpx.AsyncClient:
+        """Return this instance's client for the running event loop."""
+        loop = asyncio.get_running_loop()
+        # A closed loop can no longer run aclose(); its sockets went with it,
+        # so the client is only forgotten. Callers close clients before
+        # closing their loop via aclose().
+        for stale in [lp for lp in list(self._clients) if lp.is_closed()]:
+            self._clients.pop(stale, None)
+
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(timeout=self.timeout)
+            self._clients[loop] = client
+        return client
+
+    async def aclose(self) -> None:
+        """Close the running loop's client, if one was created."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    def _close_clients(self) -> None:
+        for loop, client in list(self._clients.items()):
+            if not loop.is_closed() and not loop.is_running():
+                loop.run_until_complete(client.aclose())
+
+    def _payload(self, texts: list[str]) -> dict:
+        return {"model": self.model, "input": texts}
+
+    @staticmethod
+    def _vectors(response: httpx.Response) -> list[list[float]]:
+        response.raise_for_status()
+        data = sorted(response.json()["data"], key=lambda item: item["index"])
+        return [item["embedding"] for item in data]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        response = httpx.post(self.url, json=self._payload(texts), timeout=self.timeout)
+        return self._vectors(response)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        response = await self._client().post(self.url, json=self._payload(texts))
+        return self._vectors(response)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return (await self.aembed_documents([text]))[0]